@@ -11,89 +11,113 @@
 
 import os
 import uuid
-import sqlite3
+import logging
+import asyncio
 from src.graph import get_graph
 from src.state import AgentState
+from src.history_db import get_checkpointer, close_db
 from dotenv import load_dotenv
-from langgraph.checkpoint.sqlite import SqliteSaver
+
+# uvloop is a faster drop-in event loop; it is not available on Windows,
+# where the stdlib loop is used instead.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Load environment variables (e.g. OPENAI_API_KEY)
 load_dotenv()
 
-def main():
+# Agent logging; set LOG_LEVEL=DEBUG to see each node as it runs
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
+async def main():
     """
     Main execution loop for the CLI interface.
     Initializes the agent graph in autonomous mode (no human-in-the-loop interrupts).
+    The graph contains async nodes, so it is driven with astream.
     """
     print("Initializing Agentic Health Agent...")
     
-    # Ensure DB exists
-    db_path = "checkpoints.sqlite"
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    checkpointer = SqliteSaver(conn)
-    
-    # Run in autonomous mode for CLI (no human interrupt)
-    graph = get_graph(checkpointer=checkpointer, with_interrupt=False)
-    
-    # Simulate a user session
-    thread_id = str(uuid.uuid4())
-    config = {"configurable": {"thread_id": thread_id}}
-    
-    print(f"Session ID: {thread_id}")
+    try:
+        # Ensure DB exists (checkpoints.sqlite in the project root)
+        checkpointer = await get_checkpointer()
+        
+        # Run in autonomous mode for CLI (no human interrupt)
+        graph = get_graph(checkpointer=checkpointer, with_interrupt=False)
     
-    while True:
-        user_input = input("\nEnter your request (or 'q' to quit): ")
-        if user_input.lower() in ['q', 'quit']:
-            break
+        while True:
+            user_input = input("\nEnter your request (or 'q' to quit): ")
+            if user_input.lower() in ['q', 'quit']:
+                break
             
-        initial_state = {
-            "user_intent": user_input,
-            "iteration_count": 0,
-            "draft_history": [],
-            "scratchpad": [],
-            "critique_feedback": [],
-            "safety_feedback": [],
-            "status": "drafting"
-        }
+            # Each request gets its own thread. Reusing one thread would keep growing
+            # the checkpointed state (the list fields are append-only reducers) and
+            # would carry the previous request's draft into the new one.
+            thread_id = uuid.uuid4().hex
+            config = {"configurable": {"thread_id": thread_id}}
+        
+            print(f"Session ID: {thread_id}")
+        
+            initial_state = {
+                "user_intent": user_input,
+                "iteration_count": 0,
+                "draft_history": [],
+                "scratchpad": [],
+                "critique_feedback": [],
+                "safety_feedback": [],
+                "status": "drafting"
+            }
         
-        print(f"\nProcessing request: {user_input}\n")
+            print(f"\nProcessing request: {user_input}\n")
         
-        # Stream events
-        # We use stream_mode="values" to see state updates or "updates" for node outputs
-        for event in graph.stream(initial_state, config=config):
-            for key, value in event.items():
-                print(f"\n--- Node: {key} ---")
-                # Print specific details based on node
-                if key == "drafter":
-                    if value.get("current_draft"):
-                        print(f"Draft Title: {value['current_draft'].title}")
-                elif key == "guardian":
-                    print(f"Safety Score: {value.get('safety_score')}")
-                    if value.get('safety_feedback'):
-                        print(f"Safety Feedback: {value['safety_feedback']}")
-                elif key == "critic":
-                    print(f"Empathy Score: {value.get('empathy_score')}")
-                    if value.get('critique_feedback'):
-                        print(f"Critique Feedback: {value['critique_feedback']}")
-                elif key == "supervisor":
-                    print(f"Status: {value.get('status')}")
+            # Stream events
+            # "updates" gives per-node outputs for logging, "values" gives the full state
+            # after each step; the last "values" event is the final state, so there is
+            # no need to re-read it from the checkpointer afterwards.
+            final_state = None
+            async for mode, event in graph.astream(initial_state, config=config, stream_mode=["updates", "values"]):
+                if mode == "values":
+                    final_state = event
+                    continue
+                for key, value in event.items():
+                    # A node that returns no updates (e.g. the Reviewer after a failed LLM call) streams None
+                    value = value or {}
+                    print(f"\n--- Node: {key} ---")
+                    # Print specific details based on node
+                    if key == "drafter":
+                        if value.get("current_draft"):
+                            print(f"Draft Title: {value['current_draft'].title}")
+                    elif key == "reviewer":
+                        print(f"Safety Score: {value.get('safety_score')}")
+                        if value.get('safety_feedback'):
+                            print(f"Safety Feedback: {value['safety_feedback']}")
+                        print(f"Empathy Score: {value.get('empathy_score')}")
+                        if value.get('critique_feedback'):
+                            print(f"Critique Feedback: {value['critique_feedback']}")
+                    elif key == "supervisor":
+                        print(f"Status: {value.get('status')}")
 
-        # Fetch final state
-        final_state = graph.get_state(config)
-        if final_state and final_state.values.get("current_draft"):
-            draft = final_state.values["current_draft"]
-            print("\n=== FINAL CBT EXERCISE ===")
-            print(f"Title: {draft.title}")
-            print(f"Description: {draft.description}")
-            print("Steps:")
-            for step in draft.steps:
-                print(f"- {step}")
-            print(f"Rationale: {draft.rationale}")
-            if draft.safety_notes:
-                print(f"Safety Notes: {draft.safety_notes}")
-            print("==========================\n")
-        else:
-            print("\nProcess finished without a final draft (or failed).")
+            if final_state and final_state.get("current_draft"):
+                draft = final_state["current_draft"]
+                print("\n=== FINAL CBT EXERCISE ===")
+                print(f"Title: {draft.title}")
+                print(f"Description: {draft.description}")
+                print("Steps:")
+                for step in draft.steps:
+                    print(f"- {step}")
+                print(f"Rationale: {draft.rationale}")
+                if draft.safety_notes:
+                    print(f"Safety Notes: {draft.safety_notes}")
+                print("==========================\n")
+            else:
+                print("\nProcess finished without a final draft (or failed).")
+    finally:
+        # aiosqlite's worker thread is not a daemon; the process can't exit until it is closed
+        await close_db()
 
 if __name__ == "__main__":
-    main()
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -8,110 +8,196 @@
 # Last Updated: 2025
 # ==============================================================================
 
-from langchain_openai import ChatOpenAI
+import asyncio
+import logging
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from src.state import AgentState, CBTExercise, AgentNote
-from datetime import datetime
+from src.agents.llm import get_llm, MODEL_NAME
+from functools import lru_cache
 import os
+import time
+import tiktoken
 
+log = logging.getLogger(__name__)
 
-def drafter_agent(state: AgentState):
+
+_DRAFT_SYSTEM_MESSAGE = """You are an expert CBT Therapist acting as a Drafter. 
+        Your goal is to create a structured CBT exercise based on the user's intent.
+        Ensure the exercise is empathetic, clear, and clinically grounded.
+        """
+
+_REVISION_SYSTEM_MESSAGE = """You are an expert CBT Therapist acting as a Drafter.
+        You need to revise the current CBT exercise based on feedback from the Clinical Critic and Safety Guardian.
+        
+        Current Draft:
+        {current_draft}
+        
+        Clinical Feedback:
+        {critique_feedback}
+        
+        Safety Feedback:
+        {safety_feedback}
+        
+        Please generate a revised version of the exercise.
+        """
+
+_DRAFT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _DRAFT_SYSTEM_MESSAGE),
+    ("user", "User Intent: {intent}")
+])
+
+_REVISION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _REVISION_SYSTEM_MESSAGE),
+    ("user", "Revise the draft based on the feedback.")
+])
+
+# Token budget for the revision prompt. Older feedback is dropped to stay under it
+# rather than sending an oversized prompt and paying for the failed round trip.
+_MAX_REVISION_PROMPT_TOKENS = 6000
+
+# Seconds to wait before retrying a tokenizer load that failed
+_ENCODING_RETRY_SECONDS = 300
+
+_encoding = None
+_encoding_failed_at = None
+
+def _get_encoding():
     """
-    Drafts a CBT exercise based on user intent or revises it based on feedback.
+    Returns the tokenizer for MODEL_NAME, or None if it cannot be loaded
+    (tiktoken downloads the BPE file on first use). Without it the
+    feedback is sent untrimmed. Only a successful load is cached; after a
+    failure the load is retried once _ENCODING_RETRY_SECONDS have passed.
+    """
+    global _encoding, _encoding_failed_at
+    if _encoding is not None:
+        return _encoding
+    if _encoding_failed_at is not None and time.monotonic() - _encoding_failed_at < _ENCODING_RETRY_SECONDS:
+        return None
+    try:
+        _encoding = tiktoken.encoding_for_model(MODEL_NAME)
+    except Exception as e:
+        _encoding_failed_at = time.monotonic()
+        log.warning("Tokenizer unavailable, skipping prompt budget check: %s", e)
+        return None
+    _encoding_failed_at = None
+    return _encoding
+
+async def _load_encoding():
+    """
+    Returns the tokenizer without blocking the event loop. The first load may
+    download the BPE file over blocking HTTP, so it runs in a worker thread.
     """
-    # Initialize LLM
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
+    if _encoding is not None:
+        return _encoding
+    return await asyncio.to_thread(_get_encoding)
 
-    print("---DRAFTER AGENT WORKING---")
+_revision_base_token_count = None
+
+def _revision_base_tokens(enc):
+    # Tokens in the fixed part of the revision prompt
+    global _revision_base_token_count
+    if _revision_base_token_count is None:
+        _revision_base_token_count = len(enc.encode(_REVISION_SYSTEM_MESSAGE))
+    return _revision_base_token_count
+
+def _trim_feedback(enc, current_draft_json, critique_feedback, safety_feedback):
+    """
+    Drops the oldest feedback entries until the revision prompt fits within
+    _MAX_REVISION_PROMPT_TOKENS, keeping at least the latest entry of each list.
+    enc is the tokenizer from _load_encoding(); None skips the check.
+    """
+    if enc is None:
+        return critique_feedback, safety_feedback
+
+    critique = list(critique_feedback)
+    safety = list(safety_feedback)
+    critique_tokens = [len(enc.encode(f)) for f in critique]
+    safety_tokens = [len(enc.encode(f)) for f in safety]
+    total = _revision_base_tokens(enc) + len(enc.encode(current_draft_json)) + sum(critique_tokens) + sum(safety_tokens)
+
+    while total > _MAX_REVISION_PROMPT_TOKENS and (len(critique) > 1 or len(safety) > 1):
+        # Trim whichever list currently holds more entries
+        if len(critique) >= len(safety):
+            critique.pop(0)
+            total -= critique_tokens.pop(0)
+        else:
+            safety.pop(0)
+            total -= safety_tokens.pop(0)
+
+    return critique, safety
+
+# Structured output makes the model return a schema-valid CBTExercise directly,
+# without a JSON schema in the prompt or text parsing afterwards.
+@lru_cache(maxsize=1)
+def _get_draft_chain():
+    return _DRAFT_PROMPT | get_llm(0.7).with_structured_output(CBTExercise)
+
+@lru_cache(maxsize=1)
+def _get_revision_chain():
+    return _REVISION_PROMPT | get_llm(0.7).with_structured_output(CBTExercise)
+
+async def drafter_agent(state: AgentState):
+    """
+    Drafts a CBT exercise based on user intent or revises it based on feedback.
+    """
+    log.debug("---DRAFTER AGENT WORKING---")
     user_intent = state["user_intent"]
     current_draft = state.get("current_draft")
     critique_feedback = state.get("critique_feedback", [])
     safety_feedback = state.get("safety_feedback", [])
     
-    parser = PydanticOutputParser(pydantic_object=CBTExercise)
-    
     if not current_draft:
         # Initial Draft
-        system_message = """You are an expert CBT Therapist acting as a Drafter. 
-        Your goal is to create a structured CBT exercise based on the user's intent.
-        Ensure the exercise is empathetic, clear, and clinically grounded.
-        
-        {format_instructions}
-        """
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_message),
-            ("user", "User Intent: {intent}")
-        ])
-        
-        chain = prompt | llm | parser
+        chain = _get_draft_chain()
         try:
-            new_draft = chain.invoke({
-                "intent": user_intent,
-                "format_instructions": parser.get_format_instructions()
+            new_draft = await chain.ainvoke({
+                "intent": user_intent
             })
             note = AgentNote(
                 agent_name="Drafter",
-                content="Created initial draft.",
-                timestamp=datetime.now().isoformat()
+                content="Created initial draft."
             )
             return {
                 "current_draft": new_draft,
+                "current_draft_json": new_draft.model_dump_json(),
                 "draft_history": [new_draft],
                 "scratchpad": [note],
                 "iteration_count": state.get("iteration_count", 0) + 1,
                 "status": "review_pending"
             }
-        except Exception as e:
+        except Exception:
             # Fallback or error handling
-            print(f"Error in drafter: {e}")
+            log.exception("Error in drafter")
             return {"status": "failed"}
             
     else:
         # Revision
-        system_message = """You are an expert CBT Therapist acting as a Drafter.
-        You need to revise the current CBT exercise based on feedback from the Clinical Critic and Safety Guardian.
-        
-        Current Draft:
-        {current_draft}
-        
-        Clinical Feedback:
-        {critique_feedback}
-        
-        Safety Feedback:
-        {safety_feedback}
-        
-        Please generate a revised version of the exercise.
-        {format_instructions}
-        """
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_message),
-            ("user", "Revise the draft based on the feedback.")
-        ])
-        
-        chain = prompt | llm | parser
+        chain = _get_revision_chain()
         try:
-            new_draft = chain.invoke({
-                "current_draft": current_draft.model_dump_json(),
-                "critique_feedback": "\n".join(critique_feedback[-3:]), # Last few feedbacks
-                "safety_feedback": "\n".join(safety_feedback[-3:]),
-                "format_instructions": parser.get_format_instructions()
+            current_draft_json = state.get("current_draft_json") or current_draft.model_dump_json()
+            # Last few feedbacks, trimmed further if the prompt would exceed the token budget
+            enc = await _load_encoding()
+            critique, safety = _trim_feedback(enc, current_draft_json, critique_feedback[-3:], safety_feedback[-3:])
+            new_draft = await chain.ainvoke({
+                "current_draft": current_draft_json,
+                "critique_feedback": "\n".join(critique),
+                "safety_feedback": "\n".join(safety)
             })
             
             note = AgentNote(
                 agent_name="Drafter",
-                content="Revised draft based on feedback.",
-                timestamp=datetime.now().isoformat()
+                content="Revised draft based on feedback."
             )
             
             return {
                 "current_draft": new_draft,
+                "current_draft_json": new_draft.model_dump_json(),
                 "draft_history": [new_draft],
                 "scratchpad": [note],
                 "iteration_count": state["iteration_count"] + 1,
                 "status": "review_pending"
             }
-        except Exception as e:
-            print(f"Error in drafter revision: {e}")
+        except Exception:
+            log.exception("Error in drafter revision")
             return {"status": "failed"}
 
@@ -9,8 +9,10 @@
 # Last Updated: 2025
 # ==============================================================================
 
+import logging
 from src.state import AgentState, AgentNote
-from datetime import datetime
+
+log = logging.getLogger(__name__)
 
 def human_review_node(state: AgentState):
     """
@@ -18,7 +20,7 @@ def human_review_node(state: AgentState):
     This node doesn't do much itself, but serves as a checkpoint 
     where the graph can be interrupted.
     """
-    print("---HUMAN REVIEW NODE---")
+    log.debug("---HUMAN REVIEW NODE---")
     
     # Check if human approved
     if state.get("human_approved"):
@@ -26,8 +28,7 @@ def human_review_node(state: AgentState):
             "status": "approved",
             "scratchpad": [AgentNote(
                 agent_name="Human",
-                content="Human approved the draft.",
-                timestamp=datetime.now().isoformat()
+                content="Human approved the draft."
             )]
         }
     elif state.get("human_feedback"):
@@ -35,8 +36,7 @@ def human_review_node(state: AgentState):
             "status": "revision_needed",
             "scratchpad": [AgentNote(
                 agent_name="Human",
-                content=f"Human feedback: {state['human_feedback']}",
-                timestamp=datetime.now().isoformat()
+                content=f"Human feedback: {state['human_feedback']}"
             )],
             "critique_feedback": [f"Human Reviewer: {state['human_feedback']}"]
         }
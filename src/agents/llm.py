@@ -0,0 +1,34 @@
+# ==============================================================================
+# Agentic Health Agent - Shared LLM Clients
+# ==============================================================================
+# Central place where the agents obtain their ChatOpenAI clients. Each client
+# is created once per temperature and reused, so its connection pool survives
+# across graph iterations. Transient OpenAI failures (rate limits, 5xx,
+# timeouts) are retried by the client with exponential backoff instead of
+# failing the node and burning a whole revision cycle.
+#
+# Created by: Human Developer
+# Last Updated: 2025
+# ==============================================================================
+
+from functools import lru_cache
+from langchain_openai import ChatOpenAI
+
+MODEL_NAME = "gpt-4o-mini"
+
+# Per-request timeout in seconds and number of retries on transient errors
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 4
+
+@lru_cache(maxsize=None)
+def get_llm(temperature: float) -> ChatOpenAI:
+    """
+    Returns the shared ChatOpenAI client for the given temperature.
+    Created lazily because the entry points load .env after importing the graph.
+    """
+    return ChatOpenAI(
+        model=MODEL_NAME,
+        temperature=temperature,
+        timeout=REQUEST_TIMEOUT,
+        max_retries=MAX_RETRIES,
+    )
@@ -0,0 +1,155 @@
+# ==============================================================================
+# Agentic Health Agent - Reviewer (Safety Guardian + Clinical Critic)
+# ==============================================================================
+# The Reviewer runs the Safety Guardian and Clinical Critic rubrics in a single
+# LLM call. The Guardian checks for risks such as self-harm, medical advice,
+# and dangerous instructions; the Critic evaluates tone, empathy, and clinical
+# quality. Sending the draft once halves the review tokens and round trips.
+#
+# Created by: Human Developer
+# Last Updated: 2025
+# ==============================================================================
+
+import logging
+from langchain_core.prompts import ChatPromptTemplate
+from src.state import AgentState, AgentNote
+from src.agents.llm import get_llm
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+from pydantic import BaseModel, Field
+
+log = logging.getLogger(__name__)
+
+
+class SafetyReview(BaseModel):
+    is_safe: bool = Field(description="True if the exercise is safe, False otherwise")
+    safety_score: int = Field(description="Safety score from 0 (dangerous) to 10 (very safe)")
+    issues: list[str] = Field(description="List of safety issues identified")
+    recommendations: list[str] = Field(description="Recommendations to improve safety")
+
+class ClinicalReview(BaseModel):
+    is_empathetic: bool = Field(description="True if the tone is sufficiently empathetic")
+    empathy_score: int = Field(description="Empathy score from 0 (cold) to 10 (very warm/supportive)")
+    clinical_quality_score: int = Field(description="Quality of CBT application 0-10")
+    feedback: list[str] = Field(description="Specific feedback on tone, language, and clinical validity")
+
+class CombinedReview(BaseModel):
+    safety: SafetyReview = Field(description="Assessment from the Safety Guardian")
+    clinical: ClinicalReview = Field(description="Assessment from the Clinical Critic")
+
+_SYSTEM_MESSAGE = """You review CBT exercises for a CBT app in two roles at once: the Safety Guardian and the Clinical Critic.
+
+    As the Safety Guardian, rigorously review the exercise for potential risks.
+    Look out for:
+    1. Instructions that might lead to self-harm.
+    2. Exercises that encourage dangerous behavior (e.g., exposure therapy that is too extreme).
+    3. Medical advice that the system is not qualified to give.
+    4. Lack of appropriate trigger warnings or safety abort protocols.
+
+    IMPORTANT CONTEXT:
+    - Standard CBT exposure exercises (e.g., facing fears) are clinically valid and NOT considered "dangerous behavior" unless they involve physical harm or extreme risk without professional supervision.
+    - Anxiety induction is part of the process; do not flag normal anxiety-provoking steps as unsafe unless they are physically dangerous.
+    - If the exercise is a standard clinical protocol (like an exposure hierarchy), it is generally safe if it includes a note about stopping if overwhelmed.
+
+    As the Clinical Critic (Senior CBT Therapist), ensure the exercise is empathetic, warm, and follows best clinical practices.
+    The tone should be validating and encouraging, not robotic or dismissive.
+
+    Review the following exercise and provide both the safety assessment and the clinical review.
+    """
+
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _SYSTEM_MESSAGE),
+    ("user", "Exercise to review:\n{exercise}")
+])
+
+# Reviews keyed by a hash of the draft JSON. An unchanged draft (e.g. a stalled
+# revision) reuses its last review instead of paying for another LLM call. Only
+# the CombinedReview is cached; notes are rebuilt on every call so their
+# timestamps reflect the current pass.
+_REVIEW_CACHE_SIZE = 128
+_review_cache: "OrderedDict[str, CombinedReview]" = OrderedDict()
+
+def _draft_key(draft_json: str) -> str:
+    # blake2b is faster than sha256 on short inputs in CPython
+    return hashlib.blake2b(draft_json.encode(), digest_size=16).hexdigest()
+
+@lru_cache(maxsize=1)
+def _get_chain():
+    """
+    Builds the review chain once on the shared LLM client. Structured output
+    makes the model return a validated CombinedReview directly.
+    """
+    return _PROMPT | get_llm(0.0).with_structured_output(CombinedReview)
+
+def _review_updates(review: CombinedReview, reused: bool = False) -> dict:
+    """
+    Turns a review into state updates, with freshly stamped scratchpad notes.
+    """
+    safety = review.safety
+    clinical = review.clinical
+    suffix = " (draft unchanged, reused previous review)" if reused else ""
+
+    now = datetime.now().isoformat()
+    safety_note = AgentNote(
+        agent_name="SafetyGuardian",
+        content=f"Safety Check Complete. Safe: {safety.is_safe}, Score: {safety.safety_score}{suffix}",
+        timestamp=now
+    )
+    clinical_note = AgentNote(
+        agent_name="ClinicalCritic",
+        content=f"Clinical Review Complete. Empathy: {clinical.empathy_score}, Quality: {clinical.clinical_quality_score}{suffix}",
+        timestamp=now
+    )
+
+    updates = {
+        "safety_score": safety.safety_score,
+        "empathy_score": clinical.empathy_score,
+        "scratchpad": [safety_note, clinical_note],
+    }
+
+    if not safety.is_safe or safety.safety_score < 8:
+        feedback_str = f"Safety Issues: {'; '.join(safety.issues)}. Recommendations: {'; '.join(safety.recommendations)}"
+        updates["safety_feedback"] = [feedback_str]
+
+    # If scores are low, provide detailed feedback
+    if clinical.empathy_score < 8 or clinical.clinical_quality_score < 8:
+        feedback_str = f"Clinical Feedback: {'; '.join(clinical.feedback)}"
+        updates["critique_feedback"] = [feedback_str]
+
+    return updates
+
+async def reviewer_agent(state: AgentState):
+    """
+    Reviews the draft for safety issues and for empathy, tone, and clinical quality
+    in a single LLM call.
+    """
+    chain = _get_chain()
+    log.debug("---REVIEWER WORKING (SAFETY GUARDIAN + CLINICAL CRITIC)---")
+    current_draft = state["current_draft"]
+
+    if not current_draft:
+        return {}
+
+    draft_json = state.get("current_draft_json") or current_draft.model_dump_json()
+    key = _draft_key(draft_json)
+    cached = _review_cache.get(key)
+    if cached is not None:
+        _review_cache.move_to_end(key)
+        log.debug("---REVIEWER: DRAFT UNCHANGED, REUSING CACHED REVIEW---")
+        return _review_updates(cached, reused=True)
+
+    try:
+        review = await chain.ainvoke({
+            "exercise": draft_json
+        })
+    except Exception:
+        log.exception("Error in reviewer")
+        return {}
+
+    _review_cache[key] = review
+    if len(_review_cache) > _REVIEW_CACHE_SIZE:
+        _review_cache.popitem(last=False)
+
+    return _review_updates(review)
@@ -2,7 +2,7 @@
 # Agentic Health Agent - Supervisor
 # ==============================================================================
 # The Supervisor acts as the router and decision maker. It aggregates reviews
-# from the Guardian and Critic and decides whether to:
+# from the Reviewer (Guardian + Critic) and decides whether to:
 # 1. Request a revision (loop back to Drafter)
 # 2. Approve the draft (send to Human Review)
 # 3. Fail safely (if max iterations reached)
@@ -11,8 +11,10 @@
 # Last Updated: 2025
 # ==============================================================================
 
+import logging
 from src.state import AgentState, AgentNote
-from datetime import datetime
+
+log = logging.getLogger(__name__)
 
 MAX_ITERATIONS = 3
 
@@ -21,7 +23,7 @@ def supervisor_node(state: AgentState):
     Supervisor reviews the state and decides the next step.
     This node effectively aggregates the reviews and sets the status.
     """
-    print("---SUPERVISOR WORKING---")
+    log.debug("---SUPERVISOR WORKING---")
     
     iteration_count = state.get("iteration_count", 0)
     safety_score = state.get("safety_score", 0)
@@ -33,7 +35,12 @@ def supervisor_node(state: AgentState):
     
     status = "drafting"
     
-    if iteration_count >= MAX_ITERATIONS:
+    if state.get("status") == "failed":
+        # The Drafter failed and the review was skipped; there is no new draft to judge.
+        status = "failed"
+        content = "Drafter failed to produce a draft. Aborting."
+    
+    elif iteration_count >= MAX_ITERATIONS:
         # Stop if we hit the limit. 
         # Check if it's "good enough" or just fail safely.
         if safety_score >= 8:
@@ -53,8 +60,7 @@ def supervisor_node(state: AgentState):
         
     note = AgentNote(
         agent_name="Supervisor",
-        content=content,
-        timestamp=datetime.now().isoformat()
+        content=content
     )
     
     return {
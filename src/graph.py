@@ -2,10 +2,10 @@
 # Agentic Health Agent - LangGraph Definition
 # ==============================================================================
 # This module defines the state graph topology for the multi-agent system.
-# It wires together the agents (Drafter, Guardian, Critic, Supervisor) and
+# It wires together the agents (Drafter, Reviewer, Supervisor) and
 # implements the control flow logic, including:
 # - Conditional routing based on Supervisor decisions
-# - Parallel execution of critique nodes
+# - A single fused Guardian + Critic review call per iteration
 # - Human-in-the-loop interruption points
 #
 # Created by: Human Developer
@@ -13,10 +13,10 @@
 # ==============================================================================
 
 from langgraph.graph import StateGraph, END, START
+from langgraph.graph.state import CompiledStateGraph
 from src.state import AgentState
 from src.agents.drafter import drafter_agent
-from src.agents.guardian import guardian_agent
-from src.agents.critic import critic_agent
+from src.agents.reviewer import reviewer_agent
 from src.agents.supervisor import supervisor_node
 from src.agents.human import human_review_node
 
@@ -25,17 +25,22 @@ builder = StateGraph(AgentState)
 
 # Add Nodes
 builder.add_node("drafter", drafter_agent)
-builder.add_node("guardian", guardian_agent)
-builder.add_node("critic", critic_agent)
+builder.add_node("reviewer", reviewer_agent)
 builder.add_node("supervisor", supervisor_node)
 builder.add_node("human_review", human_review_node)
 
 # Add Edges
 builder.add_edge(START, "drafter")
-builder.add_edge("drafter", "guardian")
-builder.add_edge("drafter", "critic")
-builder.add_edge("guardian", "supervisor")
-builder.add_edge("critic", "supervisor")
+builder.add_edge("reviewer", "supervisor")
+
+def route_drafter(state: AgentState):
+    """
+    Pre-review gate. If the Drafter failed there is nothing new to review,
+    so skip the Reviewer LLM call and go straight to the Supervisor.
+    """
+    if state.get("status") == "failed":
+        return "supervisor"
+    return "reviewer"
 
 def route_supervisor(state: AgentState):
     """
@@ -59,6 +64,16 @@ def route_human(state: AgentState):
         return "drafter"
     return END
 
+# Drafter output is only reviewed when there is a new draft
+builder.add_conditional_edges(
+    "drafter",
+    route_drafter,
+    {
+        "reviewer": "reviewer",
+        "supervisor": "supervisor"
+    }
+)
+
 # Supervisor decides next step
 builder.add_conditional_edges(
     "supervisor",
@@ -80,10 +95,27 @@ builder.add_conditional_edges(
     }
 )
 
+# Compiled graphs keyed by (id(checkpointer), with_interrupt), so repeated
+# get_graph calls skip compilation. Checkpointers are unhashable, hence the id;
+# the cached graph's checkpointer is re-checked in case an id gets reused.
+_MAX_COMPILED_GRAPHS = 4
+_compiled: dict[tuple[int, bool], CompiledStateGraph] = {}
+
 def get_graph(checkpointer=None, with_interrupt=True):
     """
     Returns the compiled graph with a checkpointer.
     """
+    key = (id(checkpointer), with_interrupt)
+    graph = _compiled.get(key)
+    if graph is not None and graph.checkpointer is checkpointer:
+        return graph
+    
     interrupt_before = ["human_review"] if with_interrupt else []
     
-    return builder.compile(checkpointer=checkpointer, interrupt_before=interrupt_before)
+    graph = builder.compile(checkpointer=checkpointer, interrupt_before=interrupt_before)
+    _compiled.pop(key, None)
+    if len(_compiled) >= _MAX_COMPILED_GRAPHS:
+        # Drop the oldest entry so stale checkpointers are not kept alive
+        _compiled.pop(next(iter(_compiled)))
+    _compiled[key] = graph
+    return graph
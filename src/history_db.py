@@ -3,21 +3,204 @@
 # ==============================================================================
 # Manages the SQLite database for logging all session history.
 # This ensures that a permanent record of all user interactions and generated
-# artifacts is kept, separate from the graph state checkpoints.
+# artifacts is kept in its own table, separate from the graph state checkpoints.
+# The history table lives in the same file as the checkpoints, and the API
+# server shares one connection between both, so all writes go through a single
+# WAL instead of two databases each syncing on their own. The checkpointer's
+# lock serializes access to that connection: history writes take it from their
+# first statement to their commit, exactly as the checkpointer's own writes do.
 #
 # Created by: Human Developer
 # Last Updated: 2025
 # ==============================================================================
 
+import asyncio
 import aiosqlite
-import json
+import orjson
+from contextlib import asynccontextmanager
 from datetime import datetime
+from pathlib import Path
+
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+# MONKEY PATCH: Fix for 'Connection' object has no attribute 'is_alive' in langgraph-checkpoint-sqlite.
+# Some releases call conn.is_alive() in setup(), which newer aiosqlite no longer
+# provides. Applied here, where every checkpointer is created, so the CLI, API,
+# and MCP entry points are all covered.
+if not hasattr(aiosqlite.Connection, 'is_alive'):
+    def is_alive(self):
+        # Check if the connection's worker thread is running
+        thread = getattr(self, "_thread", None)
+        return thread is not None and thread.is_alive()
+    setattr(aiosqlite.Connection, "is_alive", is_alive)
 
 import os
-DB_NAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "history.sqlite")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_NAME = os.path.join(PROJECT_ROOT, "checkpoints.sqlite")
+# History used to be kept in its own file; init_db imports it once if present
+LEGACY_DB_NAME = os.path.join(PROJECT_ROOT, "history.sqlite")
+
+# Connection tuning shared by the history DB and the LangGraph checkpointer.
+# WAL lets readers and the writer proceed concurrently, and synchronous=NORMAL
+# is still safe in WAL mode while avoiding an fsync on every commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+async def apply_pragmas(db: aiosqlite.Connection):
+    """
+    Applies SQLITE_PRAGMAS to an open aiosqlite connection.
+    """
+    for pragma in SQLITE_PRAGMAS:
+        await db.execute(pragma)
+
+# Prepared statements kept per connection (sqlite3 defaults to 128). Large
+# enough for every checkpoint and history query to stay prepared.
+CACHED_STATEMENTS = 256
+
+_db: aiosqlite.Connection | None = None
+_db_lock = asyncio.Lock()
+_checkpointer: AsyncSqliteSaver | None = None
+
+async def get_db() -> aiosqlite.Connection:
+    """
+    Returns the shared DB connection, opening it on first use.
+    Reusing one connection avoids paying the open (schema read + PRAGMA setup)
+    cost on every history call.
+    """
+    global _db
+    if _db is None:
+        async with _db_lock:
+            if _db is None:
+                db = await aiosqlite.connect(DB_NAME, cached_statements=CACHED_STATEMENTS)
+                await apply_pragmas(db)
+                _db = db
+    return _db
+
+async def get_checkpointer() -> AsyncSqliteSaver:
+    """
+    Returns a LangGraph checkpointer that writes through the shared connection.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        db = await get_db()
+        # No await between the check and the assignment, so concurrent first
+        # callers can't end up with two savers (and two locks) on one connection
+        if _checkpointer is None:
+            _checkpointer = AsyncSqliteSaver(db)
+    return _checkpointer
+
+@asynccontextmanager
+async def _shared_writer():
+    """
+    Yields the shared writer connection while holding the checkpointer's lock.
+    The checkpointer and history writes share one connection and therefore one
+    transaction; without the lock, a history commit could commit a checkpoint
+    write halfway through, or a statement from another coroutine could land
+    inside the history transaction.
+    """
+    saver = await get_checkpointer()
+    async with saver.lock:
+        yield saver.conn
+
+# Read-only connections for queries. In WAL mode they read concurrently with the
+# single writer connection instead of queueing behind checkpoint commits on it.
+READ_POOL_SIZE = min(4, os.cpu_count() or 1)
+_read_pool: asyncio.Queue | None = None
+_read_connections: list[aiosqlite.Connection] = []
+_read_checkpointer: AsyncSqliteSaver | None = None
+_read_lock = asyncio.Lock()
+
+async def _connect_read_only() -> aiosqlite.Connection:
+    # The writer creates the file (and switches it to WAL) before any reader opens it
+    await get_db()
+    db = await aiosqlite.connect(
+        Path(DB_NAME).as_uri() + "?mode=ro", uri=True, cached_statements=CACHED_STATEMENTS
+    )
+    await apply_pragmas(db)
+    _read_connections.append(db)
+    return db
+
+@asynccontextmanager
+async def read_connection():
+    """
+    Borrows a read-only connection from the pool for the duration of the block.
+    """
+    global _read_pool
+    if _read_pool is None:
+        async with _read_lock:
+            if _read_pool is None:
+                pool = asyncio.Queue()
+                for _ in range(READ_POOL_SIZE):
+                    pool.put_nowait(await _connect_read_only())
+                _read_pool = pool
+    db = await _read_pool.get()
+    try:
+        yield db
+    finally:
+        _read_pool.put_nowait(db)
+
+async def get_read_checkpointer() -> AsyncSqliteSaver:
+    """
+    Returns a checkpointer on a read-only connection, for state reads
+    (e.g. aget_state) that should not wait on the writer.
+    """
+    global _read_checkpointer
+    if _read_checkpointer is None:
+        async with _read_lock:
+            if _read_checkpointer is None:
+                # Tables are created through the writer; setup() would fail read-only
+                await (await get_checkpointer()).setup()
+                saver = AsyncSqliteSaver(await _connect_read_only())
+                saver.is_setup = True
+                _read_checkpointer = saver
+    return _read_checkpointer
+
+async def close_db():
+    """
+    Closes the shared DB connections. Called on server shutdown.
+    """
+    global _db, _checkpointer, _read_pool, _read_checkpointer
+    _checkpointer = None
+    _read_pool = None
+    _read_checkpointer = None
+    while _read_connections:
+        await _read_connections.pop().close()
+    if _db is not None:
+        await _db.close()
+        _db = None
+
+async def _import_legacy_history(db: aiosqlite.Connection):
+    """
+    Copies rows from the old standalone history.sqlite into the history table.
+    Only runs while the history table is still empty.
+    """
+    if not os.path.exists(LEGACY_DB_NAME):
+        return
+    cursor = await db.execute("SELECT 1 FROM history LIMIT 1")
+    has_rows = await cursor.fetchone()
+    await cursor.close()
+    if has_rows:
+        return
+
+    await db.execute("ATTACH DATABASE ? AS legacy", (LEGACY_DB_NAME,))
+    try:
+        cursor = await db.execute("SELECT 1 FROM legacy.sqlite_master WHERE type = 'table' AND name = 'history'")
+        has_table = await cursor.fetchone()
+        await cursor.close()
+        if has_table:
+            await db.execute("INSERT OR IGNORE INTO history SELECT * FROM legacy.history")
+        await db.commit()
+    finally:
+        await db.execute("DETACH DATABASE legacy")
 
 async def init_db():
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with _shared_writer() as db:
         await db.execute("""
             CREATE TABLE IF NOT EXISTS history (
                 thread_id TEXT PRIMARY KEY,
@@ -29,35 +212,53 @@ async def init_db():
             )
         """)
         await db.commit()
+        await _import_legacy_history(db)
 
-async def create_history_entry(thread_id: str, intent: str):
-    async with aiosqlite.connect(DB_NAME) as db:
-        now = datetime.now().isoformat()
+@asynccontextmanager
+async def _history_write():
+    """
+    Runs a history write as a BEGIN IMMEDIATE transaction on the shared writer.
+    Taking the write lock up front avoids a deferred transaction that later
+    upgrades to a write and fails with SQLITE_BUSY when another process (e.g. the
+    MCP and API servers share this file) is writing at the same time. The
+    checkpointer's lock is held throughout, so no other transaction is open on
+    the connection when BEGIN runs.
+    """
+    async with _shared_writer() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
+
+async def create_history_entry(thread_id: str, intent: str, status: str = "started"):
+    now = datetime.now().isoformat()
+    async with _history_write() as db:
         await db.execute(
             "INSERT INTO history (thread_id, user_intent, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-            (thread_id, intent, "started", now, now)
+            (thread_id, intent, status, now, now)
         )
-        await db.commit()
 
 async def update_history_status(thread_id: str, status: str, artifact: dict = None):
-    async with aiosqlite.connect(DB_NAME) as db:
-        now = datetime.now().isoformat()
+    now = datetime.now().isoformat()
+    async with _history_write() as db:
         if artifact:
             await db.execute(
                 "UPDATE history SET status = ?, updated_at = ?, final_artifact = ? WHERE thread_id = ?",
-                (status, now, json.dumps(artifact), thread_id)
+                (status, now, orjson.dumps(artifact).decode(), thread_id)
             )
         else:
             await db.execute(
                 "UPDATE history SET status = ?, updated_at = ? WHERE thread_id = ?",
                 (status, now, thread_id)
             )
-        await db.commit()
 
 async def get_all_history():
-    async with aiosqlite.connect(DB_NAME) as db:
-        db.row_factory = aiosqlite.Row
+    async with read_connection() as db:
         cursor = await db.execute("SELECT * FROM history ORDER BY created_at DESC")
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
-
+        columns = [col[0] for col in cursor.description]
+        await cursor.close()
+    return [dict(zip(columns, row)) for row in rows]
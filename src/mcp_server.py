@@ -22,23 +22,82 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import asyncio
 import json
+import logging
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
+from langgraph.graph.state import CompiledStateGraph
 from src.graph import get_graph
 from src.state import CBTExercise
-from src.history_db import create_history_entry, update_history_status, init_db
+from src.history_db import create_history_entry, update_history_status, init_db, close_db, get_checkpointer
 import uuid
 from dotenv import load_dotenv
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+# uvloop is a faster drop-in event loop; it is not available on Windows,
+# where the stdlib loop is used instead.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Load env vars from project root
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(project_root, ".env"))
 
+# stdout carries the MCP JSON-RPC stream, so all agent logging goes to stderr
+logging.basicConfig(stream=sys.stderr, level=os.getenv("LOG_LEVEL", "WARNING").upper())
+log = logging.getLogger(__name__)
+
 server = Server("agentic-health-agent")
 
+# Markdown returned to the MCP client for a finished exercise
+_OUTPUT_TEMPLATE = """
+# {title}
+
+{description}
+
+## Rationale
+{rationale}
+
+## Steps
+{steps}
+
+## Safety Notes
+{safety_notes}
+"""
+
+# Set once the history table exists (and legacy rows are imported)
+_db_ready = False
+
+async def _ensure_db():
+    """
+    Runs init_db() once per process. It is idempotent, so an overlapping first
+    call at worst repeats the CREATE TABLE IF NOT EXISTS.
+    """
+    global _db_ready
+    if not _db_ready:
+        await init_db()
+        _db_ready = True
+
+# Graph compiled once on first tool call and reused for the life of the process
+_graph: CompiledStateGraph | None = None
+_graph_lock = asyncio.Lock()
+
+async def _get_mcp_graph() -> CompiledStateGraph:
+    """
+    Returns the autonomous (no interrupt) graph, compiling it on first use.
+    """
+    global _graph
+    if _graph is None:
+        async with _graph_lock:
+            if _graph is None:
+                # Persist through the process-wide checkpointer (shared, tuned connection
+                # opened once and closed on server shutdown) instead of reopening it per call
+                checkpointer = await get_checkpointer()
+                _graph = get_graph(checkpointer=checkpointer, with_interrupt=False)
+    return _graph
+
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     return [
@@ -69,21 +128,13 @@ async def handle_call_tool(
     if not intent:
         raise ValueError("Intent is required")
 
-    # Initialize DBs if needed (safe to call repeatedly)
-    await init_db()
-
-    # MONKEY PATCH: Fix for 'Connection' object has no attribute 'is_alive' in langgraph-checkpoint-sqlite
-    import aiosqlite
-    if not hasattr(aiosqlite.Connection, 'is_alive'):
-        def is_alive(self):
-            # Check if the internal thread is running (common in aiosqlite)
-            return getattr(self, "_running", True)
-        setattr(aiosqlite.Connection, "is_alive", is_alive)
+    # Initialize DBs on the first call only
+    await _ensure_db()
 
     # Create thread and history
-    thread_id = str(uuid.uuid4())
-    await create_history_entry(thread_id, intent)
-    await update_history_status(thread_id, "running_mcp")
+    thread_id = uuid.uuid4().hex
+    # Created directly as running; nothing observes a separate "started" row here
+    await create_history_entry(thread_id, intent, status="running_mcp")
     
     config = {"configurable": {"thread_id": thread_id}}
     
@@ -98,72 +149,57 @@ async def handle_call_tool(
     }
 
     try:
-        # Redirect stdout to stderr to prevent breaking MCP JSON-RPC protocol with agent prints
-        old_stdout = sys.stdout
-        sys.stdout = sys.stderr
+        graph = await _get_mcp_graph()
         
-        try:
-            # Use AsyncSqliteSaver for persistence
-            db_path = os.path.join(project_root, "checkpoints.sqlite")
-            async with AsyncSqliteSaver.from_conn_string(db_path) as checkpointer:
-                # Initialize Graph with checkpointer and NO interrupt for autonomous execution
-                graph = get_graph(checkpointer=checkpointer, with_interrupt=False)
-                
-                # Execute graph to completion
-                final_state = await graph.ainvoke(inputs, config=config)
-        finally:
-            # Restore stdout
-            sys.stdout = old_stdout
+        # Execute graph to completion
+        final_state = await graph.ainvoke(inputs, config=config)
         
         draft = final_state.get("current_draft")
         if not draft:
             await update_history_status(thread_id, "failed_mcp")
             return [types.TextContent(type="text", text="Failed to generate a valid CBT exercise.")]
         
-        await update_history_status(thread_id, "completed_mcp", artifact=draft.model_dump())
+        # JSON-mode dump goes straight to orjson in the history table
+        dumped = draft.model_dump(mode="json")
+        await update_history_status(thread_id, "completed_mcp", artifact=dumped)
         
         # Format the output
-        steps_text = '\n'.join([f'{i+1}. {step}' for i, step in enumerate(draft.steps)])
-        output_text = f"""
-# {draft.title}
-
-{draft.description}
-
-## Rationale
-{draft.rationale}
-
-## Steps
-{steps_text}
-
-## Safety Notes
-{draft.safety_notes or 'None'}
-"""
+        steps_text = '\n'.join(f'{i}. {step}' for i, step in enumerate(draft.steps, 1))
+        output_text = _OUTPUT_TEMPLATE.format_map({
+            "title": draft.title,
+            "description": draft.description,
+            "rationale": draft.rationale,
+            "steps": steps_text,
+            "safety_notes": draft.safety_notes or 'None',
+        })
         return [types.TextContent(type="text", text=output_text)]
         
     except Exception as e:
-        import traceback
-        traceback.print_exc() # This will go to stderr because we redirected stdout to stderr
+        log.exception("Error executing agent")
         await update_history_status(thread_id, "error_mcp")
-        # Ensure stdout is restored if exception happened before inner try/finally
-        if sys.stdout != sys.__stdout__ and hasattr(sys, '__stdout__'):
-             sys.stdout = sys.__stdout__
         return [types.TextContent(type="text", text=f"Error executing agent: {str(e)}")]
 
 async def main():
     # Run the server using stdin/stdout streams
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="agentic-health-agent",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="agentic-health-agent",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        await close_db()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -23,42 +23,66 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
 import uuid
-import json
+import orjson
 import asyncio
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+# uvloop and httptools are C-backed replacements for the asyncio event loop and
+# the h11 HTTP parser. Fall back to the pure-Python ones when unavailable
+# (uvloop is not available on Windows).
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+try:
+    import httptools
+except ImportError:
+    httptools = None
 
 # Load env vars
 load_dotenv()
 
 from src.graph import get_graph
 from src.state import AgentState, CBTExercise
-from src.history_db import init_db, create_history_entry, update_history_status, get_all_history
+from src.history_db import init_db, close_db, get_checkpointer, get_read_checkpointer, create_history_entry, update_history_status, get_all_history
 
-# Global graph variable
+# Global graph variables. reader_graph runs on a read-only connection so
+# state reads don't queue behind checkpoint writes on the writer connection.
 graph = None
+reader_graph = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global graph
+    global graph, reader_graph
     # Initialize history DB
     await init_db()
-    # Initialize LangGraph Checkpointer
-    async with AsyncSqliteSaver.from_conn_string("checkpoints.sqlite") as checkpointer:
-        graph = get_graph(checkpointer=checkpointer)
-        yield
+    # Initialize LangGraph Checkpointer on the same connection as the history DB
+    checkpointer = await get_checkpointer()
+    graph = get_graph(checkpointer=checkpointer)
+    reader_graph = get_graph(checkpointer=await get_read_checkpointer())
+    yield
+    await close_db()
 
 app = FastAPI(title="Agentic Health Agent API", lifespan=lifespan)
 
-# Allow CORS for React app
+# Allow CORS for React app. Explicit origins, methods, and headers let Starlette
+# answer preflights with a precomputed response. Override origins with a
+# comma-separated CORS_ORIGINS when the dashboard is served elsewhere.
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 class StartRequest(BaseModel):
@@ -69,29 +93,47 @@ class ResumeRequest(BaseModel):
     feedback: str = None
     modified_draft: dict = None
 
-def serialize_event(event):
+def _dump_cached(value, cache: dict):
+    """
+    Dumps a model once per stream. The model is kept alongside its dump so the
+    id() key can't be reused by a different object while the cache is alive.
+    """
+    entry = cache.get(id(value))
+    if entry is not None and entry[0] is value:
+        return entry[1]
+    dumped = to_jsonable_python(value, serialize_as_any=True)
+    if isinstance(value, BaseModel):
+        cache[id(value)] = (value, dumped)
+    return dumped
+
+# current_draft_json is an internal, JSON-escaped copy of current_draft kept for
+# the agents; it is never sent to clients. draft_history is streamed as append
+# events instead of in every state frame.
+_STATE_EXCLUDED_KEYS = frozenset({"current_draft_json"})
+_STREAM_EXCLUDED_KEYS = _STATE_EXCLUDED_KEYS | {"draft_history"}
+
+def _without(values: dict, excluded: frozenset) -> dict:
+    return {key: value for key, value in values.items() if key not in excluded}
+
+def serialize_event(event, cache: dict = None):
     """
     Helper to serialize Pydantic models in the event state.
+    When a cache is given, list items (e.g. the growing draft_history) that were
+    already dumped earlier in the stream are reused instead of re-serialized.
     """
+    if cache is None:
+        return to_jsonable_python(event, serialize_as_any=True)
     new_event = {}
     for key, value in event.items():
-        if isinstance(value, BaseModel):
-            new_event[key] = value.model_dump()
-        elif isinstance(value, list):
-            new_list = []
-            for item in value:
-                if isinstance(item, BaseModel):
-                    new_list.append(item.model_dump())
-                else:
-                    new_list.append(item)
-            new_event[key] = new_list
+        if isinstance(value, list):
+            new_event[key] = [_dump_cached(item, cache) for item in value]
         else:
-            new_event[key] = value
+            new_event[key] = to_jsonable_python(value, serialize_as_any=True)
     return new_event
 
 @app.post("/start")
 async def start_workflow(request: StartRequest):
-    thread_id = str(uuid.uuid4())
+    thread_id = uuid.uuid4().hex
     # Log to history
     await create_history_entry(thread_id, request.intent)
     return {"thread_id": thread_id}
@@ -103,6 +145,16 @@ async def get_history_log():
     """
     return await get_all_history()
 
+# SSE keep-alive interval, and how long a send may block on a stalled client
+# before the stream is dropped (both in seconds)
+SSE_PING_INTERVAL = 15
+SSE_SEND_TIMEOUT = 5
+
+# Static frames encoded once. The interrupt frame only varies in "next", which
+# is appended to the prefix before closing the object.
+_COMPLETED_FRAME = {"data": orjson.dumps({"type": "completed"}).decode()}
+_INTERRUPT_PREFIX = orjson.dumps({"type": "interrupt"}).decode()[:-1] + ',"next":'
+
 @app.get("/stream/{thread_id}")
 async def stream_workflow(thread_id: str, intent: str = None):
     async def event_generator():
@@ -124,12 +176,38 @@ async def stream_workflow(thread_id: str, intent: str = None):
             }
              await update_history_status(thread_id, "running")
         
+        # Models already dumped during this stream, keyed by id()
+        serialized_cache = {}
+        # Last draft_history item sent to the client. A resumed stream starts from
+        # the checkpointed history, which the client already received. That copy
+        # is loaded separately from the stream's, so it is matched by value once.
+        last_sent_draft = None
+        seeded_from_checkpoint = False
+        if inputs is None:
+            prior_history = current_state.values.get("draft_history")
+            if prior_history:
+                last_sent_draft = prior_history[-1]
+                seeded_from_checkpoint = True
+
         try:
             print(f"Starting stream for thread {thread_id} with inputs: {inputs}")
             async for event in graph.astream(inputs, config=config, stream_mode="values"):
-                # Clean event for JSON serialization
-                serializable_event = serialize_event(event)
-                yield json.dumps(serializable_event, default=str)
+                # Clean event for JSON serialization. draft_history is left out of
+                # the per-node state frames; only new drafts are streamed below.
+                serializable_event = serialize_event(_without(event, _STREAM_EXCLUDED_KEYS), serialized_cache)
+                yield {"data": orjson.dumps(serializable_event, default=str).decode()}
+
+                # Compared by identity rather than length since the list is capped
+                history = event.get("draft_history")
+                if history and history[-1] is not last_sent_draft:
+                    already_sent = seeded_from_checkpoint and history[-1] == last_sent_draft
+                    seeded_from_checkpoint = False
+                    last_sent_draft = history[-1]
+                    if not already_sent:
+                        yield {"data": orjson.dumps({
+                            "type": "draft_history_append",
+                            "item": _dump_cached(last_sent_draft, serialized_cache)
+                        }, default=str).decode()}
                 
             # Check if we stopped at interrupt
             final_snapshot = await graph.aget_state(config)
@@ -137,7 +215,7 @@ async def stream_workflow(thread_id: str, intent: str = None):
             
             if final_snapshot.next:
                  await update_history_status(thread_id, "paused_for_review")
-                 yield json.dumps({"type": "interrupt", "next": final_snapshot.next})
+                 yield {"data": _INTERRUPT_PREFIX + orjson.dumps(final_snapshot.next).decode() + "}"}
             else:
                  # Check if completed successfully
                  final_values = final_snapshot.values
@@ -146,23 +224,23 @@ async def stream_workflow(thread_id: str, intent: str = None):
                  if status == "approved" or status == "completed":
                       await update_history_status(thread_id, "completed", artifact=draft.model_dump() if draft else None)
                  
-                 yield json.dumps({"type": "completed"})
+                 yield _COMPLETED_FRAME
                  
         except Exception as e:
             print(f"Error in stream: {e}")
             import traceback
             traceback.print_exc()
             await update_history_status(thread_id, "error")
-            yield json.dumps({"type": "error", "message": str(e)})
+            yield {"data": orjson.dumps({"type": "error", "message": str(e)}).decode()}
 
-    return EventSourceResponse(event_generator())
+    return EventSourceResponse(event_generator(), ping=SSE_PING_INTERVAL, send_timeout=SSE_SEND_TIMEOUT)
 
 @app.get("/state/{thread_id}")
 async def get_state(thread_id: str):
     config = {"configurable": {"thread_id": thread_id}}
-    state = await graph.aget_state(config)
+    state = await reader_graph.aget_state(config)
     # Serialize state values
-    return serialize_event(state.values)
+    return serialize_event(_without(state.values, _STATE_EXCLUDED_KEYS))
 
 @app.post("/resume/{thread_id}")
 async def resume_workflow(thread_id: str, request: ResumeRequest):
@@ -171,7 +249,9 @@ async def resume_workflow(thread_id: str, request: ResumeRequest):
     if request.action == "approve":
         updates = {"human_approved": True}
         if request.modified_draft:
-             updates["current_draft"] = CBTExercise(**request.modified_draft)
+             modified_draft = CBTExercise(**request.modified_draft)
+             updates["current_draft"] = modified_draft
+             updates["current_draft_json"] = modified_draft.model_dump_json()
              
         await graph.aupdate_state(config, updates)
         await update_history_status(thread_id, "resumed_approved")
@@ -188,4 +268,13 @@ async def resume_workflow(thread_id: str, request: ResumeRequest):
     return {"status": "updated"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # A single worker: the graph, checkpointer, and DB connections are
+    # process-wide and shared across requests.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop" if uvloop is not None else "asyncio",
+        http="httptools" if httptools is not None else "h11",
+        workers=1,
+    )
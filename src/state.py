@@ -9,7 +9,7 @@
 # Last Updated: 2025
 # ==============================================================================
 
-import operator
+from datetime import datetime
 from typing import Annotated, List, Optional, Dict, Any, TypedDict, Union
 from pydantic import BaseModel, Field
 
@@ -23,7 +23,27 @@ class CBTExercise(BaseModel):
 class AgentNote(BaseModel):
     agent_name: str
     content: str
-    timestamp: str
+    # ISO-8601 string (parsed by the dashboard); stamped once when the note is created
+    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+
+# Maximum entries kept in each append-only list in the state. Without a cap,
+# every checkpoint re-serializes the entire, ever-growing list.
+LIST_CAP = 32
+
+def _append_capped(existing: list, new: list) -> list:
+    """
+    Reducer that appends new entries and keeps only the most recent LIST_CAP.
+    Builds at most one new list; the existing list is never mutated because
+    earlier checkpoints and snapshots may still reference it.
+    """
+    overflow = len(existing) + len(new) - LIST_CAP
+    if not new and overflow <= 0:
+        return existing
+    if overflow <= 0:
+        return existing + new
+    if overflow >= len(existing):
+        return new[-LIST_CAP:]
+    return existing[overflow:] + new
 
 class AgentState(TypedDict):
     # The user's original intent
@@ -32,11 +52,15 @@ class AgentState(TypedDict):
     # The evolving draft of the CBT exercise
     current_draft: Optional[CBTExercise]
     
+    # JSON serialization of current_draft, computed once by the Drafter and
+    # reused by the Reviewer and by revisions
+    current_draft_json: Optional[str]
+    
     # History of drafts to track versions
-    draft_history: Annotated[List[CBTExercise], operator.add]
+    draft_history: Annotated[List[CBTExercise], _append_capped]
     
     # Shared scratchpad for agent communication
-    scratchpad: Annotated[List[AgentNote], operator.add]
+    scratchpad: Annotated[List[AgentNote], _append_capped]
     
     # Metadata
     iteration_count: int
@@ -47,8 +71,8 @@ class AgentState(TypedDict):
     status: str # "drafting", "reviewing", "critiquing", "completed", "failed", "pending_review"
     
     # Feedback from critics
-    critique_feedback: Annotated[List[str], operator.add]
-    safety_feedback: Annotated[List[str], operator.add]
+    critique_feedback: Annotated[List[str], _append_capped]
+    safety_feedback: Annotated[List[str], _append_capped]
     
     # Final output message to user
     final_output: Optional[str]